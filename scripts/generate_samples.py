@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """Generate voice sample files for all available voices"""
 
+import argparse
+import asyncio
 import base64
+import os
 import sys
-import time
 from pathlib import Path
 
-import requests
+import httpx
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
@@ -24,11 +26,37 @@ SAMPLES_DIR = Path(__file__).parent.parent / "samples"
 # API endpoint
 API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-tts:generateContent"
 
+# Concurrency and rate limiting defaults (override with --concurrency / --rpm)
+CONCURRENCY = 8  # Maximum voices generated at the same time
+REQUESTS_PER_MINUTE = 30  # Keep below the Gemini TTS per-minute quota
+MAX_RETRIES = 3  # Attempts per voice when rate limited (HTTP 429)
+CONNECT_RETRIES = 3  # Transport-level retries for failed connections
 
-def generate_sample(voice_name: str) -> bytes | None:
+
+class RateLimiter:
+    """Spaces out request starts to stay within a per-minute quota"""
+
+    def __init__(self, requests_per_minute: int):
+        self._interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait until the next request slot is available"""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def generate_sample(
+    client: httpx.AsyncClient, limiter: RateLimiter, voice_name: str
+) -> bytes | None:
     """Generate a sample audio for a voice using REST API"""
     try:
-        url = f"{API_URL}?key={GEMINI_API_KEY}"
         payload = {
             "contents": [
                 {
@@ -49,23 +77,87 @@ def generate_sample(voice_name: str) -> bytes | None:
             }
         }
 
-        response = requests.post(url, json=payload, timeout=60)
-        data = response.json()
+        for attempt in range(MAX_RETRIES):
+            await limiter.wait()
+            response = await client.post(API_URL, json=payload)
+
+            # Back off exponentially when the quota is exhausted
+            if response.status_code == 429 and attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(5 * 2 ** attempt)
+                continue
 
-        if "candidates" in data:
-            inline_data = data["candidates"][0]["content"]["parts"][0].get("inlineData")
-            if inline_data and inline_data.get("data"):
-                return base64.b64decode(inline_data["data"])
+            data = response.json()
 
-        if "error" in data:
-            print(f"  Error: {data['error'].get('message', 'Unknown error')}")
+            if "candidates" in data:
+                inline_data = data["candidates"][0]["content"]["parts"][0].get("inlineData")
+                if inline_data and inline_data.get("data"):
+                    return base64.b64decode(inline_data["data"])
+
+            if "error" in data:
+                print(f"  {voice_name} error: {data['error'].get('message', 'Unknown error')}")
+            return None
         return None
     except Exception as e:
-        print(f"  Error: {e}")
+        print(f"  {voice_name} error: {e}")
         return None
 
 
-def main():
+async def process_voice(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    limiter: RateLimiter,
+    existing: set[str],
+    voice_name: str,
+) -> bool:
+    """Generate and save the sample for one voice. Returns True on success."""
+    output_file = SAMPLES_DIR / f"{voice_name}.mp3"
+
+    # Skip if already exists
+    if voice_name in existing:
+        print(f"{voice_name}: Already exists, skipping")
+        return True
+
+    async with semaphore:
+        pcm_data = await generate_sample(client, limiter, voice_name)
+
+    if not pcm_data:
+        print(f"{voice_name}: FAILED")
+        return False
+
+    # Convert to MP3, written straight to the output file. Encoding runs in a
+    # worker thread (ffmpeg does the work) so other voices keep downloading.
+    try:
+        await asyncio.to_thread(AudioConverter.pcm_to_mp3_file, pcm_data, output_file)
+    except Exception as e:
+        print(f"  {voice_name} encode error: {e}")
+        print(f"{voice_name}: FAILED")
+        return False
+    duration = AudioConverter.get_duration_seconds(pcm_data)
+    print(f"{voice_name}: OK ({duration:.1f}s)")
+    return True
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"maximum concurrent generations (default: {CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=REQUESTS_PER_MINUTE,
+        help=f"maximum API requests per minute (default: {REQUESTS_PER_MINUTE})",
+    )
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.rpm < 1:
+        parser.error("--concurrency and --rpm must be positive")
+    return args
+
+
+async def main(concurrency: int, requests_per_minute: int):
     if not GEMINI_API_KEY:
         print("Error: GEMINI_API_KEY not set. Please configure .env file.")
         sys.exit(1)
@@ -73,6 +165,14 @@ def main():
     # Create output directory
     SAMPLES_DIR.mkdir(exist_ok=True)
 
+    # Collect existing samples with a single directory scan
+    with os.scandir(SAMPLES_DIR) as entries:
+        existing = {
+            entry.name[:-4]
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".mp3")
+        }
+
     voice_names = list(VOICES.keys())
     total = len(voice_names)
 
@@ -81,37 +181,29 @@ def main():
     print(f"Output directory: {SAMPLES_DIR}")
     print()
 
-    success = 0
-    failed = []
-
-    for i, voice_name in enumerate(voice_names, 1):
-        output_file = SAMPLES_DIR / f"{voice_name}.mp3"
-
-        # Skip if already exists
-        if output_file.exists():
-            print(f"[{i}/{total}] {voice_name}: Already exists, skipping")
-            success += 1
-            continue
-
-        print(f"[{i}/{total}] {voice_name}: Generating...", end=" ", flush=True)
-
-        pcm_data = generate_sample(voice_name)
-
-        if pcm_data:
-            # Convert to MP3
-            mp3_buffer = AudioConverter.pcm_to_mp3(pcm_data)
-            with open(output_file, "wb") as f:
-                f.write(mp3_buffer.read())
-            duration = AudioConverter.get_duration_seconds(pcm_data)
-            print(f"OK ({duration:.1f}s)")
-            success += 1
-        else:
-            print("FAILED")
-            failed.append(voice_name)
-
-        # Rate limiting - avoid hitting API too fast
-        if i < total:
-            time.sleep(1)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(requests_per_minute)
+
+    # One pooled client for all voices so connections (and TLS sessions) are reused
+    async with httpx.AsyncClient(
+        params={"key": GEMINI_API_KEY},
+        timeout=60.0,
+        # Limits go on the transport: httpx ignores client limits when an
+        # explicit transport is passed
+        transport=httpx.AsyncHTTPTransport(
+            retries=CONNECT_RETRIES,
+            limits=httpx.Limits(
+                max_connections=concurrency * 2,
+                max_keepalive_connections=concurrency * 2,
+            ),
+        ),
+    ) as client:
+        results = await asyncio.gather(
+            *(process_voice(client, semaphore, limiter, existing, v) for v in voice_names)
+        )
+
+    success = sum(results)
+    failed = [v for v, ok in zip(voice_names, results) if not ok]
 
     print()
     print(f"Done! {success}/{total} samples generated.")
@@ -120,4 +212,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    asyncio.run(main(args.concurrency, args.rpm))
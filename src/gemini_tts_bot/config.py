@@ -1,10 +1,13 @@
 """Configuration management for the bot"""
 
+import atexit
 import json
 import logging
 import os
 import threading
-from dataclasses import dataclass, field, asdict
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -18,24 +21,28 @@ load_dotenv(override=True)
 # Environment variables
 TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
 GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
-ALLOWED_CHAT_IDS: set[int] = set()
 
+_allowed_chat_ids: set[int] = set()
 _allowed_ids = os.getenv("ALLOWED_CHAT_IDS", "")
 if _allowed_ids:
     for x in _allowed_ids.split(","):
         x = x.strip()
         if x:
             try:
-                ALLOWED_CHAT_IDS.add(int(x))
+                _allowed_chat_ids.add(int(x))
             except ValueError:
                 # Log warning but don't crash on invalid values
                 import sys
                 print(f"Warning: Invalid chat ID '{x}' in ALLOWED_CHAT_IDS, skipping", file=sys.stderr)
 
+# Immutable after parsing: checked on every update
+ALLOWED_CHAT_IDS: frozenset[int] = frozenset(_allowed_chat_ids)
+
 # Default values
 DEFAULT_VOICE = "Kore"
 DEFAULT_PROMPT = ""
 DEFAULT_MODEL = "flash"  # flash or pro
+DEFAULT_SMART_VOICES = False  # Use Gemini to pick dialogue voices (extra API call)
 
 # Model name mapping
 TTS_MODELS = {
@@ -63,6 +70,31 @@ def _get_config_path() -> Path:
 CONFIG_FILE = _get_config_path()
 
 
+def _get_tts_cache_dir() -> Path:
+    """Get generated audio cache directory from env or use user cache directory"""
+    env_path = os.getenv("TTS_CACHE_DIR")
+    if env_path:
+        return Path(env_path)
+    return Path.home() / ".cache" / "gemini_tts_bot" / "tts"
+
+
+TTS_CACHE_DIR = _get_tts_cache_dir()
+
+
+def _get_tts_max_concurrency() -> int:
+    """Get the cap on concurrent Gemini TTS requests from env"""
+    value = os.getenv("TTS_MAX_CONCURRENCY", "")
+    try:
+        return max(1, int(value)) if value else 8
+    except ValueError:
+        logger.warning(f"Invalid TTS_MAX_CONCURRENCY '{value}', using 8")
+        return 8
+
+
+# Tune to the API key's requests-per-minute quota
+TTS_MAX_CONCURRENCY = _get_tts_max_concurrency()
+
+
 @dataclass
 class UserConfig:
     """User-specific configuration"""
@@ -70,9 +102,16 @@ class UserConfig:
     default_voice: str = DEFAULT_VOICE
     custom_prompt: str = DEFAULT_PROMPT
     tts_model: str = DEFAULT_MODEL
+    smart_voices: bool = DEFAULT_SMART_VOICES
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        # Explicit literal: asdict() deep-copies and recurses, overkill for flat fields
+        return {
+            "default_voice": self.default_voice,
+            "custom_prompt": self.custom_prompt,
+            "tts_model": self.tts_model,
+            "smart_voices": self.smart_voices,
+        }
 
     @classmethod
     def from_dict(cls, data: dict) -> "UserConfig":
@@ -80,65 +119,142 @@ class UserConfig:
             default_voice=data.get("default_voice", DEFAULT_VOICE),
             custom_prompt=data.get("custom_prompt", DEFAULT_PROMPT),
             tts_model=data.get("tts_model", DEFAULT_MODEL),
+            smart_voices=data.get("smart_voices", DEFAULT_SMART_VOICES),
         )
 
 
 class ConfigManager:
     """Manages user configurations with JSON persistence and thread safety"""
 
+    LOCK_SHARDS = 16  # Number of per-chat lock shards
+    FLUSH_DELAY = 0.5  # Seconds without changes before pending changes are written
+    MAX_FLUSH_DELAY = 5.0  # Upper bound on how long a write can be deferred
+
     def __init__(self, config_file: Path = CONFIG_FILE):
         self.config_file = config_file
-        self._configs: dict[str, UserConfig] = {}
-        self._lock = threading.RLock()  # Reentrant lock for thread safety
+        # Keyed by int chat ID; keys are converted to strings only for JSON
+        self._configs: dict[int, UserConfig] = {}
+        # Reentrant locks sharded by chat ID so different chats don't contend
+        self._locks = [threading.RLock() for _ in range(self.LOCK_SHARDS)]
+        # Serializes writes to the config file
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._dirty_event = threading.Event()
+        self._last_change = 0.0
         self._load()
 
+        # Single background writer persists changes off the request path
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="config-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _lock_for(self, chat_id: int) -> threading.RLock:
+        """Get the lock shard guarding a chat's configuration"""
+        return self._locks[chat_id % self.LOCK_SHARDS]
+
     def _load(self) -> None:
         """Load configurations from JSON file"""
-        with self._lock:
-            if self.config_file.exists():
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    for chat_id, config_data in data.items():
+                        try:
+                            self._configs[int(chat_id)] = UserConfig.from_dict(config_data)
+                        except ValueError:
+                            logger.warning(f"Skipping invalid chat ID '{chat_id}' in config file")
+                logger.info(f"Loaded {len(self._configs)} user configurations")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse config file: {e}")
+                # Backup corrupted file
+                backup_path = self.config_file.with_suffix(".json.bak")
                 try:
-                    with open(self.config_file, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        for chat_id, config_data in data.items():
-                            self._configs[chat_id] = UserConfig.from_dict(config_data)
-                    logger.info(f"Loaded {len(self._configs)} user configurations")
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse config file: {e}")
-                    # Backup corrupted file
-                    backup_path = self.config_file.with_suffix(".json.bak")
-                    try:
-                        self.config_file.rename(backup_path)
-                        logger.warning(f"Corrupted config backed up to {backup_path}")
-                    except OSError:
-                        pass
-                    self._configs = {}
-                except IOError as e:
-                    logger.error(f"Failed to read config file: {e}")
-                    self._configs = {}
+                    self.config_file.rename(backup_path)
+                    logger.warning(f"Corrupted config backed up to {backup_path}")
+                except OSError:
+                    pass
+                self._configs = {}
+            except IOError as e:
+                logger.error(f"Failed to read config file: {e}")
+                self._configs = {}
+
+    def _snapshot(self) -> dict:
+        """Serialize all configurations while holding every lock shard"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            return {str(chat_id): config.to_dict() for chat_id, config in self._configs.items()}
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
 
     def _save(self) -> None:
-        """Save configurations to JSON file with atomic write"""
-        with self._lock:
-            data = {chat_id: config.to_dict() for chat_id, config in self._configs.items()}
-            # Write to temp file first, then rename for atomic operation
-            temp_file = self.config_file.with_suffix(".json.tmp")
+        """Save configurations to JSON file with atomic write (caller holds _save_lock)"""
+        # Compact encoding, serialized in one pass and written in one call
+        payload = json.dumps(self._snapshot(), ensure_ascii=False, separators=(",", ":"))
+        # Write to temp file first, then rename for atomic operation
+        temp_file = self.config_file.with_suffix(".json.tmp")
+        try:
+            temp_file.write_text(payload, encoding="utf-8")
+            temp_file.replace(self.config_file)
+        except IOError as e:
+            logger.error(f"Failed to save config file: {e}")
+            if temp_file.exists():
+                temp_file.unlink()
+            raise
+
+    def _mark_dirty(self) -> None:
+        """Schedule a write of the current configurations"""
+        self._last_change = time.monotonic()
+        self._dirty = True
+        self._dirty_event.set()
+
+    def _writer_loop(self) -> None:
+        """Background writer: wait for changes, debounce them, then save"""
+        while True:
+            self._dirty_event.wait()
+            first_change = time.monotonic()
+            # Each change pushes the write back, so a burst collapses into one save
+            while True:
+                wake_at = min(
+                    self._last_change + self.FLUSH_DELAY,
+                    first_change + self.MAX_FLUSH_DELAY,
+                )
+                remaining = wake_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(remaining)
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending changes to disk, if any"""
+        # Held across check, clear and save so a flush (e.g. at exit) waits
+        # for a write already in progress instead of returning early
+        with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._dirty_event.clear()
             try:
-                with open(temp_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                temp_file.replace(self.config_file)
-            except IOError as e:
-                logger.error(f"Failed to save config file: {e}")
-                if temp_file.exists():
-                    temp_file.unlink()
-                raise
+                self._save()
+            except IOError:
+                # Keep the changes pending so the next flush retries
+                self._dirty = True
 
     def get(self, chat_id: int) -> UserConfig:
         """Get configuration for a chat, creating default if not exists"""
-        with self._lock:
-            key = str(chat_id)
-            if key not in self._configs:
-                self._configs[key] = UserConfig()
-            return self._configs[key]
+        # Fast path: existing configs are read without taking a lock
+        config = self._configs.get(chat_id)
+        if config is not None:
+            return config
+        with self._lock_for(chat_id):
+            config = self._configs.get(chat_id)
+            if config is None:
+                config = UserConfig()
+                self._configs[chat_id] = config
+            return config
 
     def set_voice(self, chat_id: int, voice: str) -> bool:
         """Set default voice for a chat. Returns True if successful."""
@@ -149,22 +265,22 @@ class ConfigManager:
             logger.warning(f"Invalid voice '{voice}' for chat {chat_id}")
             return False
 
-        with self._lock:
+        with self._lock_for(chat_id):
             config = self.get(chat_id)
             config.default_voice = voice
-            self._save()
+            self._mark_dirty()
             return True
 
     def set_prompt(self, chat_id: int, prompt: str) -> None:
         """Set custom prompt for a chat"""
-        with self._lock:
+        with self._lock_for(chat_id):
             # Validate prompt length
             if len(prompt) > MAX_PROMPT_LENGTH:
                 prompt = prompt[:MAX_PROMPT_LENGTH]
                 logger.warning(f"Prompt truncated to {MAX_PROMPT_LENGTH} chars for chat {chat_id}")
             config = self.get(chat_id)
             config.custom_prompt = prompt
-            self._save()
+            self._mark_dirty()
 
     def set_model(self, chat_id: int, model: str) -> bool:
         """Set TTS model for a chat. Returns True if successful."""
@@ -172,24 +288,35 @@ class ConfigManager:
             logger.warning(f"Invalid model '{model}' for chat {chat_id}")
             return False
 
-        with self._lock:
+        with self._lock_for(chat_id):
             config = self.get(chat_id)
             config.tts_model = model
-            self._save()
+            self._mark_dirty()
             return True
 
+    def set_smart_voices(self, chat_id: int, enabled: bool) -> None:
+        """Enable or disable Gemini-based dialogue voice selection for a chat"""
+        with self._lock_for(chat_id):
+            config = self.get(chat_id)
+            config.smart_voices = enabled
+            self._mark_dirty()
+
     def reset(self, chat_id: int) -> None:
         """Reset configuration for a chat to defaults"""
-        with self._lock:
-            self._configs[str(chat_id)] = UserConfig()
-            self._save()
+        with self._lock_for(chat_id):
+            self._configs[chat_id] = UserConfig()
+            self._mark_dirty()
 
 
 # Global config manager instance
 config_manager = ConfigManager()
 
-# Track users who have had their commands set (in memory, resets on restart)
-_commands_set_for: set[int] = set()
+# Track users who have had their commands set (in memory, resets on restart).
+# Bounded LRU so long-running bots without an allow list don't grow it forever;
+# an evicted chat just gets its commands set again on its next interaction.
+MAX_COMMANDS_SET_TRACKED = 10000
+_commands_set_for: OrderedDict[int, None] = OrderedDict()
+_commands_set_lock = threading.Lock()
 
 
 def is_allowed_chat(chat_id: int) -> bool:
@@ -211,9 +338,17 @@ def validate_config() -> list[str]:
 
 def needs_commands_setup(chat_id: int) -> bool:
     """Check if commands need to be set up for this chat"""
-    return chat_id not in _commands_set_for
+    with _commands_set_lock:
+        if chat_id in _commands_set_for:
+            _commands_set_for.move_to_end(chat_id)
+            return False
+        return True
 
 
 def mark_commands_set(chat_id: int) -> None:
     """Mark that commands have been set for this chat"""
-    _commands_set_for.add(chat_id)
+    with _commands_set_lock:
+        _commands_set_for[chat_id] = None
+        _commands_set_for.move_to_end(chat_id)
+        if len(_commands_set_for) > MAX_COMMANDS_SET_TRACKED:
+            _commands_set_for.popitem(last=False)
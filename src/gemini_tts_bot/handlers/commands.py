@@ -1,11 +1,15 @@
 """Slash command handlers for the bot"""
 
-import io
 import re
+from functools import lru_cache
+from pathlib import Path
 
 from telegram import BotCommand, BotCommandScopeChat, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+# Characters that have meaning in Markdown V1
+_MDV1_ESCAPE_RE = re.compile(r"([_*`\[])")
+
 
 def escape_markdown_v1(text: str) -> str:
     """Escape Markdown V1 special characters to prevent Telegram BadRequest errors.
@@ -16,9 +20,7 @@ def escape_markdown_v1(text: str) -> str:
     - [link](url)
     - `code`
     """
-    # Only escape characters that have meaning in Markdown V1
-    escape_chars = r"_*`["
-    return re.sub(f"([{re.escape(escape_chars)}])", r"\\\1", text)
+    return _MDV1_ESCAPE_RE.sub(r"\\\1", text)
 
 from ..config import config_manager, is_allowed_chat, needs_commands_setup, mark_commands_set, TTS_MODELS
 from ..services.tts import tts_service
@@ -38,11 +40,115 @@ _BOT_COMMANDS = [
     BotCommand("voice", "Choose your default voice"),
     BotCommand("model", "Switch TTS model (flash/pro)"),
     BotCommand("prompt", "Set custom TTS style"),
+    BotCommand("smartvoice", "Toggle AI voice matching for dialogues"),
     BotCommand("reset", "Reset all settings to default"),
     BotCommand("help", "Show help message"),
 ]
 
 
+# Static message texts, built once at import time
+_WELCOME_TEXT = """Welcome to Gemini TTS Bot!
+
+Send me any text and I'll convert it to speech using Google's Gemini TTS.
+
+**Features:**
+- **Monologue**: Send plain text for single-voice narration
+- **Dialogue**: Send text with speaker names (e.g., "Alice: Hello\\nBob: Hi!") for multi-voice conversation
+
+**Commands:**
+- /voice - Choose your default voice
+- /model - Switch TTS model (flash/pro)
+- /prompt - Set custom TTS style (pace, tone, etc.)
+- /smartvoice - Toggle AI voice matching for dialogues
+- /reset - Reset all settings to default
+- /help - Show this help message
+
+**Current Settings:**
+"""
+
+_PROMPT_HELP_TEMPLATE = (
+    "**Custom TTS Prompt**\n\n"
+    "Current: {current}\n\n"
+    "**Usage:**\n"
+    "`/prompt <your instructions>`\n"
+    "`/prompt clear` - Remove custom prompt\n\n"
+    "**Examples:**\n"
+    "• `/prompt Speak slowly and clearly`\n"
+    "• `/prompt Use a warm, friendly tone`\n"
+    "• `/prompt Read with dramatic pauses`"
+)
+
+_RESET_TEMPLATE = (
+    "Settings have been reset to defaults!\n\n"
+    "**Current Settings:**\n"
+    "- Voice: {voice}\n"
+    "- Model: {model}\n"
+    "- Smart voices: {smart_voices}\n"
+    "- Custom Prompt: (none)"
+)
+
+_SMART_VOICES_USAGE = (
+    "**Smart Voice Selection**\n\n"
+    "Current: {current}\n\n"
+    "When on, Gemini picks dialogue voices to match each speaker "
+    "(slightly slower). When off, voices are assigned instantly.\n\n"
+    "**Usage:**\n"
+    "`/smartvoice` - Toggle\n"
+    "`/smartvoice on` / `/smartvoice off`"
+)
+
+
+def _on_off(enabled: bool) -> str:
+    return "on" if enabled else "off"
+
+
+def _voice_buttons(voice_names, per_row: int) -> list[list[InlineKeyboardButton]]:
+    """Pack voice preview buttons into keyboard rows"""
+    keyboard = []
+    row = []
+    for voice_name in voice_names:
+        row.append(InlineKeyboardButton(
+            voice_name,
+            callback_data=f"voice_preview:{voice_name}",
+        ))
+        if len(row) == per_row:
+            keyboard.append(row)
+            row = []
+    if row:
+        keyboard.append(row)
+    return keyboard
+
+
+def _build_featured_markup() -> InlineKeyboardMarkup:
+    """Build the featured voices keyboard (2 per row) with a "More voices" button"""
+    keyboard = _voice_buttons(FEATURED_VOICES, per_row=2)
+    keyboard.append([
+        InlineKeyboardButton("More voices...", callback_data="voice_more"),
+    ])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _build_all_voices_markup() -> InlineKeyboardMarkup:
+    """Build the keyboard of non-featured voices (3 per row) with a "Back" button"""
+    other_voices = [v for v in VOICES if v not in FEATURED_VOICES]
+    keyboard = _voice_buttons(other_voices, per_row=3)
+    keyboard.append([
+        InlineKeyboardButton("« Back", callback_data="voice_back"),
+    ])
+    return InlineKeyboardMarkup(keyboard)
+
+
+# Voice menus are static, so build them once at import time
+FEATURED_MARKUP = _build_featured_markup()
+ALL_VOICES_MARKUP = _build_all_voices_markup()
+
+
+@lru_cache(maxsize=64)
+def _load_sample_bytes(sample_path: Path) -> bytes:
+    """Read a pre-generated voice sample, cached in memory for repeat previews"""
+    return sample_path.read_bytes()
+
+
 async def _ensure_commands_set(bot, chat_id: int) -> None:
     """Ensure commands are set for this chat (called on first interaction)"""
     if needs_commands_setup(chat_id):
@@ -69,35 +175,21 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Ensure commands are set for this user (on first interaction)
     await _ensure_commands_set(context.bot, chat_id)
 
-    welcome_text = """Welcome to Gemini TTS Bot!
-
-Send me any text and I'll convert it to speech using Google's Gemini TTS.
-
-**Features:**
-- **Monologue**: Send plain text for single-voice narration
-- **Dialogue**: Send text with speaker names (e.g., "Alice: Hello\\nBob: Hi!") for multi-voice conversation
-
-**Commands:**
-- /voice - Choose your default voice
-- /model - Switch TTS model (flash/pro)
-- /prompt - Set custom TTS style (pace, tone, etc.)
-- /reset - Reset all settings to default
-- /help - Show this help message
-
-**Current Settings:**
-"""
     config = config_manager.get(chat_id)
-    settings_text = f"- Voice: {config.default_voice}\n"
-    settings_text += f"- Model: {config.tts_model}\n"
     if config.custom_prompt:
         # Escape markdown special characters in user-provided prompt
         escaped_prompt = escape_markdown_v1(config.custom_prompt)
-        settings_text += f"- Custom Prompt: {escaped_prompt}\n"
     else:
-        settings_text += "- Custom Prompt: (none)\n"
+        escaped_prompt = "(none)"
+    settings_text = (
+        f"- Voice: {config.default_voice}\n"
+        f"- Model: {config.tts_model}\n"
+        f"- Smart voices: {_on_off(config.smart_voices)}\n"
+        f"- Custom Prompt: {escaped_prompt}\n"
+    )
 
     await update.message.reply_text(
-        welcome_text + settings_text,
+        _WELCOME_TEXT + settings_text,
         parse_mode="Markdown",
     )
 
@@ -116,35 +208,12 @@ async def voice_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not is_allowed_chat(chat_id):
         return
 
-    # Build inline keyboard with featured voices (2 per row)
-    keyboard = []
-    row = []
-    for voice_name in FEATURED_VOICES:
-        desc = get_voice_description(voice_name)
-        button = InlineKeyboardButton(
-            f"{voice_name}",
-            callback_data=f"voice_preview:{voice_name}",
-        )
-        row.append(button)
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
-
-    # Add "More voices" button
-    keyboard.append([
-        InlineKeyboardButton("More voices...", callback_data="voice_more"),
-    ])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     current_voice = config_manager.get(chat_id).default_voice
     await update.message.reply_text(
         f"**Select a voice to preview**\n\n"
         f"Current voice: {current_voice}\n\n"
         f"Tap a voice to hear a sample, then confirm to set as default.",
-        reply_markup=reply_markup,
+        reply_markup=FEATURED_MARKUP,
         parse_mode="Markdown",
     )
 
@@ -165,29 +234,9 @@ async def voice_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if data == "voice_more":
         # Show all voices
-        keyboard = []
-        row = []
-        for voice_name in VOICES.keys():
-            if voice_name not in FEATURED_VOICES:
-                button = InlineKeyboardButton(
-                    voice_name,
-                    callback_data=f"voice_preview:{voice_name}",
-                )
-                row.append(button)
-                if len(row) == 3:
-                    keyboard.append(row)
-                    row = []
-        if row:
-            keyboard.append(row)
-
-        keyboard.append([
-            InlineKeyboardButton("« Back", callback_data="voice_back"),
-        ])
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text(
             "**All available voices**\n\nTap to preview:",
-            reply_markup=reply_markup,
+            reply_markup=ALL_VOICES_MARKUP,
             parse_mode="Markdown",
         )
 
@@ -199,31 +248,12 @@ async def voice_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         except Exception:
             pass
 
-        keyboard = []
-        row = []
-        for voice_name in FEATURED_VOICES:
-            button = InlineKeyboardButton(
-                voice_name,
-                callback_data=f"voice_preview:{voice_name}",
-            )
-            row.append(button)
-            if len(row) == 2:
-                keyboard.append(row)
-                row = []
-        if row:
-            keyboard.append(row)
-
-        keyboard.append([
-            InlineKeyboardButton("More voices...", callback_data="voice_more"),
-        ])
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
         current_voice = config_manager.get(chat_id).default_voice
         await query.message.chat.send_message(
             f"**Select a voice to preview**\n\n"
             f"Current voice: {current_voice}\n\n"
             f"Tap a voice to hear a sample, then confirm to set as default.",
-            reply_markup=reply_markup,
+            reply_markup=FEATURED_MARKUP,
             parse_mode="Markdown",
         )
 
@@ -237,9 +267,9 @@ async def voice_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         sample_path = get_sample_path(voice_name)
 
         if sample_path:
-            # Use local sample file with proper resource management
-            with open(sample_path, "rb") as f:
-                mp3_data = io.BytesIO(f.read())
+            # Use local sample file (served from memory after the first read).
+            # reply_voice accepts bytes directly, so the cached data is not copied.
+            mp3_data = _load_sample_bytes(sample_path)
         else:
             # Fallback: generate on the fly
             await query.edit_message_text(f"Generating preview for {voice_name}...")
@@ -421,15 +451,7 @@ async def prompt_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             current = "(none)"
 
         await update.message.reply_text(
-            f"**Custom TTS Prompt**\n\n"
-            f"Current: {current}\n\n"
-            f"**Usage:**\n"
-            f"`/prompt <your instructions>`\n"
-            f"`/prompt clear` - Remove custom prompt\n\n"
-            f"**Examples:**\n"
-            f"• `/prompt Speak slowly and clearly`\n"
-            f"• `/prompt Use a warm, friendly tone`\n"
-            f"• `/prompt Read with dramatic pauses`",
+            _PROMPT_HELP_TEMPLATE.format(current=current),
             parse_mode="Markdown",
         )
 
@@ -447,10 +469,43 @@ async def reset_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     config = config_manager.get(chat_id)
 
     await update.message.reply_text(
-        f"Settings have been reset to defaults!\n\n"
-        f"**Current Settings:**\n"
-        f"- Voice: {config.default_voice}\n"
-        f"- Model: {config.tts_model}\n"
-        f"- Custom Prompt: (none)",
+        _RESET_TEMPLATE.format(
+            voice=config.default_voice,
+            model=config.tts_model,
+            smart_voices=_on_off(config.smart_voices),
+        ),
+        parse_mode="Markdown",
+    )
+
+
+async def smartvoice_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /smartvoice command - toggle Gemini-based dialogue voice selection"""
+    if not update.effective_chat or not update.message:
+        return
+
+    chat_id = update.effective_chat.id
+    if not is_allowed_chat(chat_id):
+        return
+
+    config = config_manager.get(chat_id)
+
+    if context.args:
+        arg = context.args[0].lower()
+        if arg in ("on", "enable", "true"):
+            enabled = True
+        elif arg in ("off", "disable", "false"):
+            enabled = False
+        else:
+            await update.message.reply_text(
+                _SMART_VOICES_USAGE.format(current=_on_off(config.smart_voices)),
+                parse_mode="Markdown",
+            )
+            return
+    else:
+        enabled = not config.smart_voices
+
+    config_manager.set_smart_voices(chat_id, enabled)
+    await update.message.reply_text(
+        f"✓ Smart voice selection **{_on_off(enabled)}**",
         parse_mode="Markdown",
     )
@@ -1,7 +1,7 @@
 """Text message handler for TTS conversion"""
 
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -10,28 +10,66 @@ from ..config import config_manager, is_allowed_chat, MAX_TEXT_LENGTH
 from ..services.tts import tts_service
 from ..services.analyzer import dialogue_analyzer
 from ..services.audio import AudioConverter
+from ..utils.cache import LRUCache
+from ..utils.voices import VOICES
 from .commands import _ensure_commands_set
 
 # Rate limiting: max requests per user per minute
 RATE_LIMIT_REQUESTS = 5
 RATE_LIMIT_WINDOW = 60  # seconds
+RATE_LIMIT_SWEEP_INTERVAL = 300  # seconds between stale-entry sweeps
+
+# Recently spoken monologue texts; repeating one rotates to another voice
+RECENT_TEXTS_MAX = 1024  # Entries across all chats (least recently used evicted)
+RECENT_TEXT_TTL = 3600  # Seconds after which a repeat counts as a fresh text
+
+# Track user request timestamps for rate limiting (oldest first, bounded per user)
+_user_requests: dict[int, deque[float]] = defaultdict(
+    lambda: deque(maxlen=RATE_LIMIT_REQUESTS)
+)
+_last_sweep = 0.0
+
+# (chat_id, text hash, default voice) -> (times repeated, last spoken at).
+# Keyed on the default voice so picking a new one with /voice starts over.
+_recent_texts = LRUCache(max_entries=RECENT_TEXTS_MAX)
+_VOICE_ORDER = tuple(VOICES)
+
+
+def _sweep_rate_limits(now: float) -> None:
+    """Forget users with no requests left in the rate limit window"""
+    cutoff = now - RATE_LIMIT_WINDOW
+    stale = [
+        chat_id for chat_id, timestamps in _user_requests.items()
+        if not timestamps or timestamps[-1] <= cutoff
+    ]
+    for chat_id in stale:
+        del _user_requests[chat_id]
+
 
-# Track user request timestamps for rate limiting
-_user_requests: dict[int, list[float]] = defaultdict(list)
+def _rotate_voice(voice_name: str, steps: int) -> str:
+    """Get the voice `steps` places after voice_name in the voice list"""
+    if not steps or voice_name not in VOICES:
+        return voice_name
+    index = _VOICE_ORDER.index(voice_name)
+    return _VOICE_ORDER[(index + steps) % len(_VOICE_ORDER)]
 
 
 def _check_rate_limit(chat_id: int) -> bool:
     """Check if user is within rate limit. Returns True if allowed."""
+    global _last_sweep
     now = time.time()
-    # Clean old entries
-    _user_requests[chat_id] = [
-        ts for ts in _user_requests[chat_id]
-        if now - ts < RATE_LIMIT_WINDOW
-    ]
+    # Periodically drop inactive users so the dict tracks only active ones
+    if now - _last_sweep > RATE_LIMIT_SWEEP_INTERVAL:
+        _last_sweep = now
+        _sweep_rate_limits(now)
+    timestamps = _user_requests[chat_id]
+    # Drop entries that have left the window
+    while timestamps and now - timestamps[0] >= RATE_LIMIT_WINDOW:
+        timestamps.popleft()
     # Check limit
-    if len(_user_requests[chat_id]) >= RATE_LIMIT_REQUESTS:
+    if len(timestamps) >= RATE_LIMIT_REQUESTS:
         return False
-    _user_requests[chat_id].append(now)
+    timestamps.append(now)
     return True
 
 
@@ -75,7 +113,7 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     processing_msg = await update.message.reply_text("Analyzing text...")
 
     # Analyze if this is dialogue or monologue
-    analysis = await dialogue_analyzer.analyze(text)
+    analysis = await dialogue_analyzer.analyze(text, smart_voices=config.smart_voices)
 
     if analysis.error:
         await processing_msg.edit_text(f"Error: {analysis.error}")
@@ -98,25 +136,35 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         for speaker, voice in analysis.speakers:
             caption += f"• {speaker}: {voice}\n"
     else:
-        # Single speaker monologue
+        # Single speaker monologue; a repeated text steps past the default
+        # voice once per recent repeat. The new voice changes the TTS cache
+        # key, so repeats deliberately bypass the audio cache (a fresh API call)
+        recent_key = (chat_id, hash(text), config.default_voice)
+        now = time.time()
+        recent = _recent_texts.get(recent_key)
+        repeats = recent[0] if recent and now - recent[1] < RECENT_TEXT_TTL else 0
+        voice_name = _rotate_voice(config.default_voice, repeats)
+
         await processing_msg.edit_text(
-            f"Generating audio with voice: {config.default_voice}..."
+            f"Generating audio with voice: {voice_name}..."
         )
 
         result = await tts_service.generate_monologue(
             text=text,
-            voice_name=config.default_voice,
+            voice_name=voice_name,
             custom_prompt=config.custom_prompt,
             model=config.tts_model,
         )
+        if result.success:
+            _recent_texts.set(recent_key, (repeats + 1, now))
 
-        caption = f"Voice: {config.default_voice} | Model: {config.tts_model}"
+        caption = f"Voice: {voice_name} | Model: {config.tts_model}"
 
     # Handle result
     if result.success:
         # Convert PCM to M4A
         try:
-            audio_data = AudioConverter.pcm_to_m4a(result.audio_data)
+            audio_data = await AudioConverter.pcm_to_m4a_async(result.audio_data)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"gemini_tts_{timestamp}.m4a"
             audio_data.name = filename
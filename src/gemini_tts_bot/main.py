@@ -1,5 +1,6 @@
 """Main entry point for Gemini TTS Telegram Bot"""
 
+import asyncio
 import logging
 import sys
 
@@ -26,9 +27,11 @@ from .handlers.commands import (
     model_command,
     model_callback,
     prompt_command,
+    smartvoice_command,
     reset_command,
 )
 from .handlers.text import text_handler
+from .services.tts import tts_service
 
 # Configure logging
 logging.basicConfig(
@@ -44,31 +47,47 @@ BOT_COMMANDS = [
     BotCommand("voice", "Choose your default voice"),
     BotCommand("model", "Switch TTS model (flash/pro)"),
     BotCommand("prompt", "Set custom TTS style"),
+    BotCommand("smartvoice", "Toggle AI voice matching for dialogues"),
     BotCommand("reset", "Reset all settings to default"),
     BotCommand("help", "Show help message"),
 ]
 
 
+async def _prime_commands_for_chat(bot, chat_id: int) -> None:
+    """Set commands for an allowed chat at startup"""
+    try:
+        await bot.set_my_commands(
+            BOT_COMMANDS,
+            scope=BotCommandScopeChat(chat_id=chat_id),
+        )
+        mark_commands_set(chat_id)
+        logger.info(f"Set commands for chat_id: {chat_id}")
+    except Exception as e:
+        # May fail if bot hasn't chatted with user yet - will be set on first message
+        logger.debug(f"Could not set commands for chat_id {chat_id}: {e}")
+
+
+async def _clear_default_commands(bot) -> None:
+    """Clear commands for everyone (default scope) - non-whitelisted users see nothing"""
+    await bot.set_my_commands([], scope=BotCommandScopeDefault())
+    logger.info("Cleared default command menu for non-whitelisted users")
+
+
 async def post_init(application: Application) -> None:
     """Set up bot commands after initialization"""
     bot = application.bot
 
-    # Clear commands for everyone (default scope) - non-whitelisted users see nothing
-    await bot.set_my_commands([], scope=BotCommandScopeDefault())
-    logger.info("Cleared default command menu for non-whitelisted users")
+    # Scopes are independent, so clear the default menu and set commands for
+    # all allowed chats concurrently (first messages then skip the extra call)
+    await asyncio.gather(
+        _clear_default_commands(bot),
+        *(_prime_commands_for_chat(bot, chat_id) for chat_id in ALLOWED_CHAT_IDS),
+    )
+
 
-    # Try to set commands for each allowed chat
-    for chat_id in ALLOWED_CHAT_IDS:
-        try:
-            await bot.set_my_commands(
-                BOT_COMMANDS,
-                scope=BotCommandScopeChat(chat_id=chat_id),
-            )
-            mark_commands_set(chat_id)
-            logger.info(f"Set commands for chat_id: {chat_id}")
-        except Exception as e:
-            # May fail if bot hasn't chatted with user yet - will be set on first message
-            logger.debug(f"Could not set commands for chat_id {chat_id}: {e}")
+async def post_shutdown(application: Application) -> None:
+    """Release shared resources on shutdown"""
+    await tts_service.aclose()
 
 
 async def setup_commands_for_chat(bot, chat_id: int) -> None:
@@ -96,11 +115,12 @@ def main() -> None:
 
     logger.info("Starting Gemini TTS Bot...")
 
-    # Create application with post_init hook
+    # Create application with post_init / post_shutdown hooks
     application = (
         Application.builder()
         .token(TELEGRAM_BOT_TOKEN)
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
@@ -110,6 +130,7 @@ def main() -> None:
     application.add_handler(CommandHandler("voice", voice_command))
     application.add_handler(CommandHandler("model", model_command))
     application.add_handler(CommandHandler("prompt", prompt_command))
+    application.add_handler(CommandHandler("smartvoice", smartvoice_command))
     application.add_handler(CommandHandler("reset", reset_command))
 
     # Register callback handlers for voice and model selection
@@ -1,9 +1,9 @@
 """Dialogue analysis service using Gemini"""
 
-import asyncio
 import json
 import logging
 import re
+import zlib
 from dataclasses import dataclass
 from typing import Optional
 
@@ -11,6 +11,7 @@ from google import genai
 from google.genai import types
 
 from ..config import GEMINI_API_KEY
+from ..utils.cache import LRUCache, content_key
 from ..utils.voices import VOICES, get_voice_for_character
 
 logger = logging.getLogger(__name__)
@@ -41,25 +42,62 @@ class DialogueAnalyzer:
         re.MULTILINE
     )
 
-    # Patterns to exclude (URLs, times, technical patterns, etc.)
-    EXCLUDE_PATTERNS = [
-        re.compile(r"^\d+$"),                    # Pure numbers like "10"
-        re.compile(r"^https?$", re.I),           # URL schemes
-        re.compile(r"^\d{1,2}$"),                # Time hours like "10" in "10:30"
-        re.compile(r".*\d+$"),                   # Ends with number (like "Step 1")
-        re.compile(r"^(http|https|ftp|file)$", re.I),  # Protocol names
-        re.compile(r"^(note|warning|error|info|debug|step)$", re.I),  # Common labels
-    ]
+    # Names to exclude (URLs, times, technical patterns, etc.), combined into
+    # one pattern so each candidate needs a single fullmatch
+    EXCLUDE_PATTERN = re.compile(
+        r"""
+        .*\d                                  # Numbers / ends with number ("10", "Step 1")
+        | https? | ftp | file                   # URL schemes and protocol names
+        | note | warning | error | info | debug | step  # Common labels
+        """,
+        re.IGNORECASE | re.VERBOSE,
+    )
+
+    # Voice catalog is static: format the prompt listing and name order once
+    _VOICE_LIST = "\n".join(f"- {name}: {info.description}" for name, info in VOICES.items())
+    _VOICE_NAMES = tuple(VOICES)
+
+    # Analysis prompt with the voice catalog baked in; only {speakers} and
+    # {text} are filled in per request
+    _PROMPT_TEMPLATE = """Analyze the following dialogue and assign appropriate voices to each speaker.
+
+Available voices and their characteristics:
+""" + _VOICE_LIST.replace("{", "{{").replace("}", "}}") + """
+
+Speakers in the dialogue: {speakers}
+
+Dialogue:
+{text}
+
+Based on the content and context of the dialogue, assign the most appropriate voice to each speaker.
+Consider factors like:
+- Gender implied by name or content
+- Age (young/old)
+- Personality (cheerful, serious, calm, etc.)
+- Role (narrator, protagonist, etc.)
+
+Respond ONLY with a JSON object in this exact format:
+{{"assignments": [{{"speaker": "speaker_name", "voice": "voice_name", "reason": "brief reason"}}]}}
+
+Make sure each speaker gets a DIFFERENT voice."""
+
+    # Voices for local (no API call) dialogue assignment
+    LOCAL_VOICE_POOL = ("Charon", "Zephyr", "Kore", "Puck", "Orus", "Leda")
+
+    ANALYSIS_CACHE_SIZE = 256  # Voice assignments cached by dialogue text hash
 
     def __init__(self):
         self.client = genai.Client(api_key=GEMINI_API_KEY)
+        self._cache = LRUCache(max_entries=self.ANALYSIS_CACHE_SIZE)
 
-    async def analyze(self, text: str) -> DialogueAnalysis:
+    async def analyze(self, text: str, smart_voices: bool = False) -> DialogueAnalysis:
         """
         Analyze text to determine if it's dialogue and assign voices.
 
         Args:
             text: The text to analyze
+            smart_voices: Use Gemini to match voices to speakers (extra API
+                call); otherwise voices are assigned locally from speaker names
 
         Returns:
             DialogueAnalysis with speaker information
@@ -83,9 +121,22 @@ class DialogueAnalyzer:
                 error=f"检测到 {len(speakers)} 个说话人，但目前仅支持最多 2 人的对话。请简化文本后重试。",
             )
 
+        # Fast path: pick voices locally, no network round-trip
+        if not smart_voices:
+            return DialogueAnalysis(
+                is_dialogue=True, speakers=self._assign_local_voices(speakers)
+            )
+
+        # Speakers are derived from the text, so the text alone keys the result
+        cache_key = content_key(text)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return DialogueAnalysis(is_dialogue=True, speakers=list(cached))
+
         # Use Gemini to analyze speaker characteristics and assign voices
         try:
             voice_assignments = await self._analyze_with_gemini(text, speakers)
+            self._cache.set(cache_key, tuple(voice_assignments))
             return DialogueAnalysis(is_dialogue=True, speakers=voice_assignments)
         except Exception as e:
             logger.exception("Gemini analysis failed, using fallback")
@@ -95,63 +146,24 @@ class DialogueAnalyzer:
 
     def _extract_speakers_simple(self, text: str) -> list[str]:
         """Extract unique speaker names using regex"""
-        matches = self.DIALOGUE_PATTERN.findall(text)
-        # Get unique speakers while preserving order
-        seen = set()
-        speakers = []
-        for name in matches:
-            name = name.strip()
-            if not name or name in seen:
-                continue
-            # Apply exclusion patterns
-            excluded = False
-            for pattern in self.EXCLUDE_PATTERNS:
-                if pattern.match(name):
-                    excluded = True
-                    break
-            if not excluded:
-                seen.add(name)
-                speakers.append(name)
-        return speakers
+        # Most messages are monologues: skip the regex when there is no colon at all
+        if ":" not in text and "：" not in text:
+            return []
+        names = (m.group(1).strip() for m in self.DIALOGUE_PATTERN.finditer(text))
+        # Unique speakers in order of appearance, minus excluded names
+        return list(dict.fromkeys(
+            name for name in names
+            if name and not self.EXCLUDE_PATTERN.fullmatch(name)
+        ))
 
     async def _analyze_with_gemini(
         self, text: str, speakers: list[str]
     ) -> list[tuple[str, str]]:
         """Use Gemini to analyze speaker characteristics and assign voices"""
-        # Run blocking API call in thread pool
-        return await asyncio.to_thread(
-            self._analyze_with_gemini_sync, text, speakers
-        )
-
-    def _analyze_with_gemini_sync(
-        self, text: str, speakers: list[str]
-    ) -> list[tuple[str, str]]:
-        """Synchronous implementation of Gemini analysis"""
-        voice_names = list(VOICES.keys())
-
-        prompt = f"""Analyze the following dialogue and assign appropriate voices to each speaker.
-
-Available voices and their characteristics:
-{self._format_voice_list()}
-
-Speakers in the dialogue: {speakers}
-
-Dialogue:
-{text}
-
-Based on the content and context of the dialogue, assign the most appropriate voice to each speaker.
-Consider factors like:
-- Gender implied by name or content
-- Age (young/old)
-- Personality (cheerful, serious, calm, etc.)
-- Role (narrator, protagonist, etc.)
-
-Respond ONLY with a JSON object in this exact format:
-{{"assignments": [{{"speaker": "speaker_name", "voice": "voice_name", "reason": "brief reason"}}]}}
-
-Make sure each speaker gets a DIFFERENT voice."""
+        prompt = self._PROMPT_TEMPLATE.format(speakers=speakers, text=text)
 
-        response = self.client.models.generate_content(
+        # Native async client: no worker thread per request
+        response = await self.client.aio.models.generate_content(
             model=self.MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
@@ -187,7 +199,7 @@ Make sure each speaker gets a DIFFERENT voice."""
 
                 # Ensure unique voices
                 if voice in used_voices:
-                    for v in voice_names:
+                    for v in self._VOICE_NAMES:
                         if v not in used_voices:
                             voice = v
                             break
@@ -199,7 +211,7 @@ Make sure each speaker gets a DIFFERENT voice."""
             # Handle missing speakers (ensure all original speakers get assigned)
             for speaker in speakers:
                 if speaker not in assigned_speakers:
-                    for v in voice_names:
+                    for v in self._VOICE_NAMES:
                         if v not in used_voices:
                             assignments.append((speaker, v))
                             used_voices.add(v)
@@ -211,6 +223,20 @@ Make sure each speaker gets a DIFFERENT voice."""
         except (json.JSONDecodeError, KeyError):
             return self._assign_default_voices(speakers)
 
+    def _assign_local_voices(self, speakers: list[str]) -> list[tuple[str, str]]:
+        """Assign distinct voices deterministically from speaker names"""
+        pool = self.LOCAL_VOICE_POOL
+        used_voices = set()
+        assignments = []
+        for speaker in speakers[:2]:
+            # crc32 is stable across restarts, unlike the salted built-in hash()
+            index = zlib.crc32(speaker.encode("utf-8")) % len(pool)
+            while pool[index] in used_voices:
+                index = (index + 1) % len(pool)
+            used_voices.add(pool[index])
+            assignments.append((speaker, pool[index]))
+        return assignments
+
     def _assign_default_voices(self, speakers: list[str]) -> list[tuple[str, str]]:
         """Assign default voices when analysis fails"""
         default_voices = ["Charon", "Zephyr", "Kore", "Puck"]
@@ -219,13 +245,6 @@ Make sure each speaker gets a DIFFERENT voice."""
             assignments.append((speaker, default_voices[i % len(default_voices)]))
         return assignments
 
-    def _format_voice_list(self) -> str:
-        """Format voice list for the prompt"""
-        lines = []
-        for name, info in VOICES.items():
-            lines.append(f"- {name}: {info.description}")
-        return "\n".join(lines)
-
 
 # Global analyzer instance
 dialogue_analyzer = DialogueAnalyzer()
@@ -1,6 +1,13 @@
 """Audio format conversion service"""
 
+import asyncio
 import io
+import os
+import subprocess
+import tempfile
+import wave
+from pathlib import Path
+
 from pydub import AudioSegment
 
 
@@ -11,6 +18,7 @@ class AudioConverter:
     SAMPLE_RATE = 24000
     CHANNELS = 1
     SAMPLE_WIDTH = 2  # 16-bit = 2 bytes
+    BYTES_PER_SECOND = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
 
     @classmethod
     def pcm_to_mp3(cls, pcm_data: bytes, bitrate: str = "128k") -> io.BytesIO:
@@ -39,6 +47,69 @@ class AudioConverter:
 
         return mp3_buffer
 
+    @classmethod
+    def pcm_to_mp3_file(
+        cls, pcm_data: bytes, path: Path | str, bitrate: str = "128k"
+    ) -> None:
+        """
+        Convert PCM audio data to MP3 and write it directly to a file.
+
+        Args:
+            pcm_data: Raw PCM audio bytes (24kHz, mono, 16-bit)
+            path: Output MP3 file path
+            bitrate: MP3 bitrate (default: 128k)
+        """
+        # PCM is streamed to ffmpeg via stdin and ffmpeg writes the file itself,
+        # so the MP3 is never buffered in memory. It writes a sibling temp file
+        # that is renamed into place only after a successful encode, so a
+        # failed or interrupted run never leaves a truncated MP3 at `path`.
+        path = Path(path)
+        temp_file = path.with_name(f"{path.name}.tmp")
+        try:
+            process = subprocess.run(
+                cls._ffmpeg_command("-b:a", bitrate, "-f", "mp3", "-y", str(temp_file)),
+                input=pcm_data,
+                capture_output=True,
+            )
+            cls._check_ffmpeg(process.returncode, process.stderr)
+            os.replace(temp_file, path)
+        except BaseException:
+            temp_file.unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def _ffmpeg_command(cls, *output_args: str) -> list[str]:
+        """Build an ffmpeg command reading raw PCM (24kHz, mono, 16-bit) from stdin"""
+        return [
+            AudioSegment.converter,  # ffmpeg binary as discovered by pydub
+            "-hide_banner",
+            "-loglevel", "error",
+            "-f", "s16le",
+            "-ar", str(cls.SAMPLE_RATE),
+            "-ac", str(cls.CHANNELS),
+            "-i", "pipe:0",
+            *output_args,
+        ]
+
+    @classmethod
+    def _m4a_command(cls, output_file: Path, bitrate: str) -> list[str]:
+        """Build the ffmpeg command encoding stdin PCM to an M4A (AAC) file"""
+        # MP4 output must be seekable (faststart moves the index to the front
+        # for streaming), so ffmpeg writes to a file rather than stdout
+        return cls._ffmpeg_command(
+            "-c:a", "aac",
+            "-b:a", bitrate,
+            "-movflags", "+faststart",
+            "-f", "ipod",
+            "-y", str(output_file),
+        )
+
+    @staticmethod
+    def _check_ffmpeg(returncode: int, stderr: bytes) -> None:
+        """Raise if an ffmpeg process failed"""
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
     @classmethod
     def pcm_to_m4a(cls, pcm_data: bytes, bitrate: str = "128k") -> io.BytesIO:
         """
@@ -51,16 +122,42 @@ class AudioConverter:
         Returns:
             BytesIO containing M4A data
         """
-        audio = AudioSegment(
-            data=pcm_data,
-            sample_width=cls.SAMPLE_WIDTH,
-            frame_rate=cls.SAMPLE_RATE,
-            channels=cls.CHANNELS,
-        )
+        # PCM is streamed to a single ffmpeg process via stdin
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = Path(tmp_dir) / "audio.m4a"
+            process = subprocess.run(
+                cls._m4a_command(output_file, bitrate),
+                input=pcm_data,
+                capture_output=True,
+            )
+            cls._check_ffmpeg(process.returncode, process.stderr)
+            m4a_buffer = io.BytesIO(output_file.read_bytes())
+
+        return m4a_buffer
+
+    @classmethod
+    async def pcm_to_m4a_async(cls, pcm_data: bytes, bitrate: str = "128k") -> io.BytesIO:
+        """
+        Convert PCM audio data to M4A (AAC) format without blocking the event loop.
+
+        Args:
+            pcm_data: Raw PCM audio bytes (24kHz, mono, 16-bit)
+            bitrate: Audio bitrate (default: 128k)
 
-        m4a_buffer = io.BytesIO()
-        audio.export(m4a_buffer, format="ipod", bitrate=bitrate)
-        m4a_buffer.seek(0)
+        Returns:
+            BytesIO containing M4A data
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = Path(tmp_dir) / "audio.m4a"
+            process = await asyncio.create_subprocess_exec(
+                *cls._m4a_command(output_file, bitrate),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate(pcm_data)
+            cls._check_ffmpeg(process.returncode, stderr)
+            m4a_buffer = io.BytesIO(output_file.read_bytes())
 
         return m4a_buffer
 
@@ -99,15 +196,13 @@ class AudioConverter:
         Returns:
             BytesIO containing WAV data
         """
-        audio = AudioSegment(
-            data=pcm_data,
-            sample_width=cls.SAMPLE_WIDTH,
-            frame_rate=cls.SAMPLE_RATE,
-            channels=cls.CHANNELS,
-        )
-
+        # WAV is just a RIFF header around the raw PCM, no ffmpeg needed
         wav_buffer = io.BytesIO()
-        audio.export(wav_buffer, format="wav")
+        with wave.open(wav_buffer, "wb") as wav:
+            wav.setnchannels(cls.CHANNELS)
+            wav.setsampwidth(cls.SAMPLE_WIDTH)
+            wav.setframerate(cls.SAMPLE_RATE)
+            wav.writeframes(pcm_data)
         wav_buffer.seek(0)
 
         return wav_buffer
@@ -123,5 +218,5 @@ class AudioConverter:
         Returns:
             Duration in seconds
         """
-        # bytes / (sample_width * channels * sample_rate) = seconds
-        return len(pcm_data) / (cls.SAMPLE_WIDTH * cls.CHANNELS * cls.SAMPLE_RATE)
+        # Derived from the byte length alone, never by decoding the audio
+        return len(pcm_data) / cls.BYTES_PER_SECOND
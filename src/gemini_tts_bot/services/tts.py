@@ -1,20 +1,110 @@
 """Gemini TTS service"""
 
 import asyncio
-import base64
+import binascii
+import importlib.util
 import logging
+import random
 from dataclasses import dataclass
 from typing import Optional
 
 import httpx
 
-from ..config import GEMINI_API_KEY, TTS_MODELS, DEFAULT_MODEL
+from ..config import (
+    GEMINI_API_KEY,
+    TTS_MODELS,
+    DEFAULT_MODEL,
+    TTS_CACHE_DIR,
+    TTS_MAX_CONCURRENCY,
+)
+from ..utils.cache import DiskCache, LRUCache, content_key
+from ..utils.voices import VOICES
 
 logger = logging.getLogger(__name__)
 
 # API endpoint
 API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
 
+# HTTP/2 lets concurrent requests share one connection; httpx needs the
+# optional h2 package for it, so only enable it when installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Prebuilt voiceConfig payload fragments, built once per voice and shared
+# read-only between requests
+_VOICE_CONFIGS = {
+    name: {"prebuiltVoiceConfig": {"voiceName": name}} for name in VOICES
+}
+
+
+def _voice_config(voice_name: str) -> dict:
+    """Get the voiceConfig payload for a voice (do not mutate the result)"""
+    config = _VOICE_CONFIGS.get(voice_name)
+    if config is None:
+        config = {"prebuiltVoiceConfig": {"voiceName": voice_name}}
+    return config
+
+
+# Request fields shared by every TTS call (do not mutate)
+_RESPONSE_MODALITIES = ("AUDIO",)
+
+
+def _build_payload(text: str, custom_prompt: str, speech_config: dict) -> dict:
+    """Build a generateContent request body around a speechConfig"""
+    # Build content with optional style instructions
+    if custom_prompt:
+        content = f"[Instructions: {custom_prompt}]\n\n{text}"
+    else:
+        content = text
+
+    return {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": content}]
+            }
+        ],
+        "generationConfig": {
+            "temperature": 1,
+            "responseModalities": _RESPONSE_MODALITIES,
+            "speechConfig": speech_config,
+        }
+    }
+
+
+# Finish reasons that are deterministic for a given input, so not worth retrying
+_NON_RETRYABLE_FINISH_REASONS = frozenset(
+    {"SAFETY", "PROHIBITED_CONTENT", "BLOCKLIST", "SPII"}
+)
+
+_AUTH_ERROR = "API authentication error. Please check your configuration."
+_QUOTA_ERROR = "API quota exceeded. Please try again later."
+
+# Error sanitizing rules, checked in order against the lowercased message.
+# A rule matches when all of its substrings are present.
+_API_ERROR_RULES = (
+    (("quota",), _QUOTA_ERROR),
+    (("limit",), _QUOTA_ERROR),
+    (("invalid", "key"), _AUTH_ERROR),
+)
+_EXCEPTION_RULES = (
+    # Never echo messages that may contain API keys or tokens
+    (("api_key",), _AUTH_ERROR),
+    (("token",), _AUTH_ERROR),
+    (("quota",), _QUOTA_ERROR),
+    (("limit",), _QUOTA_ERROR),
+    (("timeout",), "Request timed out. Please try again."),
+    (("connection",), "Connection error. Please check your network."),
+)
+
+
+def _match_error_rule(text: str, rules: tuple) -> Optional[str]:
+    """Return the message of the first rule matching text, if any"""
+    text = text.lower()
+    for needles, message in rules:
+        if all(needle in text for needle in needles):
+            return message
+    return None
+
 
 @dataclass
 class TTSResult:
@@ -23,24 +113,101 @@ class TTSResult:
     audio_data: bytes
     success: bool
     error: Optional[str] = None
+    retryable: bool = True  # False when retrying cannot change the outcome
 
 
 class TTSService:
     """Service for generating speech using Gemini TTS"""
 
     MAX_RETRIES = 3
+    # Exponential backoff between attempts: base * 2**attempt plus jitter
+    RETRY_BASE_DELAY = 1.0
+    # Upper bound on a server-requested Retry-After wait
+    RETRY_MAX_DELAY = 20.0
+
+    # Generated PCM cache, keyed by a hash of everything that shapes the audio
+    CACHE_MAX_ENTRIES = 64
+    CACHE_MAX_BYTES = 64 * 1024 * 1024
+    # Persistent copy of the cache so it survives restarts
+    DISK_CACHE_MAX_BYTES = 1024 * 1024 * 1024
 
     def __init__(self):
         self.api_key = GEMINI_API_KEY
-
-    def _get_model_name(self, model: str) -> str:
-        """Get full model name from short name"""
-        return TTS_MODELS.get(model, TTS_MODELS[DEFAULT_MODEL])
+        # Full request URL per short model name, built once
+        self._urls = {
+            short_name: f"{API_URL}/{model_name}:generateContent?key={self.api_key}"
+            for short_name, model_name in TTS_MODELS.items()
+        }
+        self._cache = LRUCache(
+            max_entries=self.CACHE_MAX_ENTRIES,
+            max_size=self.CACHE_MAX_BYTES,
+            sizeof=len,
+        )
+        self._disk_cache = DiskCache(TTS_CACHE_DIR, self.DISK_CACHE_MAX_BYTES)
+        # Long-lived client so requests and retries reuse warm connections
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(90.0, connect=10.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=15.0,
+            ),
+        )
+        # Caps in-flight API calls across all chats to stay within quota
+        self._semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+        # Running requests by cache key, so identical concurrent requests
+        # share one API call
+        self._inflight: dict[bytes, asyncio.Task] = {}
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client (call on shutdown)"""
+        await self._client.aclose()
+
+    async def _cache_get(self, key: bytes) -> Optional[bytes]:
+        """Look up generated audio in memory, then on disk"""
+        audio = self._cache.get(key)
+        if audio is None:
+            audio = await asyncio.to_thread(self._disk_cache.get, key)
+            if audio is not None:
+                self._cache.set(key, audio)
+        return audio
+
+    async def _cache_set(self, key: bytes, audio: bytes) -> None:
+        """Store generated audio in memory and on disk (best effort, never raises)"""
+        self._cache.set(key, audio)
+        try:
+            await asyncio.to_thread(self._disk_cache.set, key, audio)
+        except OSError as e:
+            logger.warning(f"Failed to store audio in disk cache: {e}")
+
+    @staticmethod
+    def _extract_audio(candidate: dict) -> Optional[bytes]:
+        """Decode the first inline audio part of a candidate, if any"""
+        content = candidate.get("content")
+        if not content:
+            return None
+        for part in content.get("parts") or ():
+            inline_data = part.get("inlineData")
+            if not inline_data:
+                continue
+            data = inline_data.get("data")
+            # Skip non-audio inline parts (mimeType is e.g. "audio/L16;codec=pcm;rate=24000")
+            if data and inline_data.get("mimeType", "audio/").startswith("audio/"):
+                # a2b_base64 takes the ASCII str directly, skipping b64decode's wrapper
+                return binascii.a2b_base64(data)
+        return None
 
     def _parse_response(self, data: dict) -> TTSResult:
         """Parse API response and extract audio data"""
-        # Log full response for debugging
-        logger.debug(f"API response: {data}")
+        # Log response for debugging, leaving out the (multi-MB) audio payload.
+        # Guarded so nothing is formatted when DEBUG is off.
+        if logger.isEnabledFor(logging.DEBUG):
+            preview = {
+                key: "<omitted>" if key == "candidates" else value
+                for key, value in data.items()
+            }
+            logger.debug("API response: %s", preview)
 
         if "candidates" in data:
             candidate = data["candidates"][0]
@@ -57,18 +224,16 @@ class TTSService:
                     audio_data=b"",
                     success=False,
                     error=f"Content blocked: {finish_reason}",
+                    retryable=finish_reason not in _NON_RETRYABLE_FINISH_REASONS,
                 )
 
             # Try to get audio data
-            content = candidate.get("content")
-            if content and "parts" in content:
-                inline_data = content["parts"][0].get("inlineData")
-                if inline_data and inline_data.get("data"):
-                    audio_data = base64.b64decode(inline_data["data"])
-                    return TTSResult(audio_data=audio_data, success=True)
+            audio_data = self._extract_audio(candidate)
+            if audio_data is not None:
+                return TTSResult(audio_data=audio_data, success=True)
 
             # No content in candidate - log for debugging
-            logger.warning(f"No content in candidate: {candidate}")
+            logger.warning("No content in candidate: %s", candidate)
             return TTSResult(
                 audio_data=b"",
                 success=False,
@@ -111,63 +276,18 @@ class TTSService:
         Returns:
             TTSResult with audio data or error
         """
-        # Build content with optional style instructions
-        if custom_prompt:
-            content = f"[Instructions: {custom_prompt}]\n\n{text}"
-        else:
-            content = text
-
-        model_name = self._get_model_name(model)
-        url = f"{API_URL}/{model_name}:generateContent?key={self.api_key}"
-        payload = {
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [{"text": content}]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 1,
-                "responseModalities": ["AUDIO"],
-                "speechConfig": {
-                    "voiceConfig": {
-                        "prebuiltVoiceConfig": {
-                            "voiceName": voice_name
-                        }
-                    }
-                }
-            }
-        }
-
-        last_error = None
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(url, json=payload)
-                    data = response.json()
-
-                result = self._parse_response(data)
-                if result.success:
-                    return result
-
-                # If failed with "OTHER" or similar, retry
-                last_error = result.error
-                if attempt < self.MAX_RETRIES - 1:
-                    logger.warning(f"TTS attempt {attempt + 1} failed: {result.error}, retrying...")
-                    await asyncio.sleep(1)  # Brief delay before retry
-
-            except Exception as e:
-                logger.exception(f"TTS monologue attempt {attempt + 1} failed")
-                last_error = self._sanitize_error(e)
-                if attempt < self.MAX_RETRIES - 1:
-                    await asyncio.sleep(1)
-
-        return TTSResult(
-            audio_data=b"",
-            success=False,
-            error=last_error or "TTS generation failed after retries",
+        cache_key = content_key("monologue", model, voice_name, custom_prompt, text)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return TTSResult(audio_data=cached, success=True)
+
+        url = self._urls.get(model) or self._urls[DEFAULT_MODEL]
+        payload = _build_payload(
+            text, custom_prompt, {"voiceConfig": _voice_config(voice_name)}
         )
 
+        return await self._generate(url, payload, "monologue", cache_key)
+
     async def generate_dialogue(
         self,
         text: str,
@@ -194,94 +314,188 @@ class TTSService:
                 error="Gemini TTS supports maximum 2 speakers",
             )
 
-        # Build content with optional style instructions
-        if custom_prompt:
-            content = f"[Instructions: {custom_prompt}]\n\n{text}"
-        else:
-            content = text
+        cache_key = content_key(
+            "dialogue", model, custom_prompt, text,
+            *(part for pair in speakers for part in pair),
+        )
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return TTSResult(audio_data=cached, success=True)
 
         # Build speaker voice configs
-        speaker_configs = []
-        for speaker_name, voice_name in speakers:
-            speaker_configs.append({
-                "speaker": speaker_name,
-                "voiceConfig": {
-                    "prebuiltVoiceConfig": {
-                        "voiceName": voice_name
-                    }
-                }
-            })
-
-        model_name = self._get_model_name(model)
-        url = f"{API_URL}/{model_name}:generateContent?key={self.api_key}"
-        payload = {
-            "contents": [
-                {
-                    "role": "user",
-                    "parts": [{"text": content}]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 1,
-                "responseModalities": ["AUDIO"],
-                "speechConfig": {
-                    "multiSpeakerVoiceConfig": {
-                        "speakerVoiceConfigs": speaker_configs
-                    }
-                }
-            }
-        }
+        speaker_configs = [
+            {"speaker": speaker_name, "voiceConfig": _voice_config(voice_name)}
+            for speaker_name, voice_name in speakers
+        ]
+
+        url = self._urls.get(model) or self._urls[DEFAULT_MODEL]
+        payload = _build_payload(
+            text,
+            custom_prompt,
+            {"multiSpeakerVoiceConfig": {"speakerVoiceConfigs": speaker_configs}},
+        )
+
+        return await self._generate(url, payload, "dialogue", cache_key)
+
+    async def generate_batch(self, requests: list[dict]) -> list:
+        """
+        Generate speech for several single-speaker texts concurrently.
+
+        Requests still share the service-wide concurrency cap
+        (TTS_MAX_CONCURRENCY), so a large batch cannot exceed the quota.
 
+        Args:
+            requests: Keyword arguments for generate_monologue, one dict per text
+
+        Returns:
+            List of TTSResult (or the raised exception) in request order
+        """
+        return await asyncio.gather(
+            *(self.generate_monologue(**request) for request in requests),
+            return_exceptions=True,
+        )
+
+    async def _generate(
+        self,
+        url: str,
+        payload: dict,
+        label: str,
+        cache_key: bytes,
+    ) -> TTSResult:
+        """
+        Send a TTS request, joining an identical one already in flight.
+
+        The request runs as its own task, shielded from callers: one caller
+        being cancelled does not fail the others, and a finished result
+        still lands in the cache.
+
+        Args:
+            url: Full generateContent endpoint URL
+            payload: Request body
+            label: Request kind used in log messages
+            cache_key: Key identifying the request and its cached audio
+
+        Returns:
+            TTSResult with audio data or error
+        """
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(
+                self._request_with_retries(url, payload, label, cache_key)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.debug(f"Joining in-flight TTS {label} request")
+        return await asyncio.shield(task)
+
+    async def _request_with_retries(
+        self,
+        url: str,
+        payload: dict,
+        label: str,
+        cache_key: bytes,
+    ) -> TTSResult:
+        """
+        Send a TTS request with retries and cache a successful result.
+
+        Args:
+            url: Full generateContent endpoint URL
+            payload: Request body
+            label: Request kind used in log messages
+            cache_key: Key to store the audio under on success
+
+        Returns:
+            TTSResult with audio data or error
+        """
         last_error = None
         for attempt in range(self.MAX_RETRIES):
+            response = None
             try:
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(url, json=payload)
-                    data = response.json()
+                async with self._semaphore:
+                    response = await self._client.post(url, json=payload)
+                data = response.json()
 
                 result = self._parse_response(data)
                 if result.success:
+                    break
+                if not result.retryable:
                     return result
 
+                # If failed with "OTHER" or similar, retry
                 last_error = result.error
                 if attempt < self.MAX_RETRIES - 1:
-                    logger.warning(f"TTS dialogue attempt {attempt + 1} failed: {result.error}, retrying...")
-                    await asyncio.sleep(1)
+                    delay = self._retry_delay(
+                        attempt, response, quota=result.error == _QUOTA_ERROR
+                    )
+                    logger.warning(
+                        f"TTS {label} attempt {attempt + 1} failed: {result.error}, "
+                        f"retrying in {delay:.1f}s..."
+                    )
+                    await asyncio.sleep(delay)
 
             except Exception as e:
-                logger.exception(f"TTS dialogue attempt {attempt + 1} failed")
+                logger.exception(f"TTS {label} attempt {attempt + 1} failed")
                 last_error = self._sanitize_error(e)
                 if attempt < self.MAX_RETRIES - 1:
-                    await asyncio.sleep(1)
+                    await asyncio.sleep(self._retry_delay(attempt, response))
+        else:
+            return TTSResult(
+                audio_data=b"",
+                success=False,
+                error=last_error or "TTS generation failed after retries",
+            )
 
-        return TTSResult(
-            audio_data=b"",
-            success=False,
-            error=last_error or "TTS generation failed after retries",
-        )
+        # Cached outside the retry handling so a cache failure cannot fail
+        # (and re-request) a successful generation
+        await self._cache_set(cache_key, result.audio_data)
+        return result
+
+    def _retry_delay(
+        self,
+        attempt: int,
+        response: Optional[httpx.Response] = None,
+        quota: bool = False,
+    ) -> float:
+        """
+        Get the wait before the next attempt.
+
+        Rate-limited responses honor a numeric Retry-After header (capped at
+        RETRY_MAX_DELAY); everything else backs off exponentially with jitter
+        so concurrent retries do not fire in lockstep.
+
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            response: HTTP response of that attempt, if one was received
+            quota: Whether the failure was a quota error
+
+        Returns:
+            Delay in seconds
+        """
+        if response is not None and (quota or response.status_code == 429):
+            try:
+                retry_after = float(response.headers.get("retry-after", 0))
+            except ValueError:
+                retry_after = 0.0  # HTTP-date form; fall back to backoff
+            if retry_after > 0:
+                return min(retry_after, self.RETRY_MAX_DELAY)
+        base = self.RETRY_BASE_DELAY * 2 ** attempt
+        return base + random.uniform(0, self.RETRY_BASE_DELAY / 2)
 
     def _sanitize_error_message(self, msg: str) -> str:
         """Sanitize API error message"""
-        if "quota" in msg.lower() or "limit" in msg.lower():
-            return "API quota exceeded. Please try again later."
-        if "invalid" in msg.lower() and "key" in msg.lower():
-            return "API authentication error. Please check your configuration."
-        return "TTS generation failed. Please try again."
+        return (
+            _match_error_rule(msg, _API_ERROR_RULES)
+            or "TTS generation failed. Please try again."
+        )
 
     def _sanitize_error(self, e: Exception) -> str:
         """Sanitize error message to avoid leaking sensitive information"""
-        error_str = str(e)
-        # Remove potential API keys or tokens from error messages
-        if "api_key" in error_str.lower() or "token" in error_str.lower():
-            return "API authentication error. Please check your configuration."
-        if "quota" in error_str.lower() or "limit" in error_str.lower():
-            return "API quota exceeded. Please try again later."
-        if "timeout" in error_str.lower():
-            return "Request timed out. Please try again."
-        if "connection" in error_str.lower():
-            return "Connection error. Please check your network."
-        # For other errors, return a generic message with the exception type
-        return f"TTS generation failed: {type(e).__name__}"
+        # For unrecognized errors, return a generic message with the exception type
+        return (
+            _match_error_rule(str(e), _EXCEPTION_RULES)
+            or f"TTS generation failed: {type(e).__name__}"
+        )
 
 
 # Global TTS service instance
@@ -0,0 +1,180 @@
+"""In-memory caching utilities"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts: str) -> bytes:
+    """Build a compact cache key from the given strings using BLAKE2b"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        data = part.encode("utf-8")
+        # Length prefix keeps ("ab", "c") and ("a", "bc") distinct
+        digest.update(len(data).to_bytes(4, "little"))
+        digest.update(data)
+    return digest.digest()
+
+
+class LRUCache:
+    """Bounded least-recently-used cache.
+
+    Limited by entry count and, when ``sizeof`` is given, by the total size
+    of the cached values. Not thread-safe: intended for use from the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_size: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._sizeof = sizeof
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value (marking it recently used), or None if missing"""
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting least recently used entries to stay in bounds"""
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.max_size and size > self.max_size:
+            return  # Larger than the whole cache, don't evict everything for it
+
+        old = self._data.pop(key, None)
+        if old is not None and self._sizeof:
+            self._size -= self._sizeof(old)
+
+        self._data[key] = value
+        self._size += size
+        while len(self._data) > self.max_entries or (
+            self.max_size and self._size > self.max_size
+        ):
+            _, evicted = self._data.popitem(last=False)
+            if self._sizeof:
+                self._size -= self._sizeof(evicted)
+
+
+class DiskCache:
+    """Size-bounded cache of bytes values stored as files in a directory.
+
+    Least recently used files (by modification time, refreshed on read) are
+    removed once the total size exceeds ``max_size``. Blocking; call it from a
+    worker thread when used in async code.
+    """
+
+    PRUNE_RATIO = 0.9  # Prune down to this fraction of max_size to avoid rescanning each write
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = 0
+        self.enabled = True
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._size = self._scan_size()
+        except OSError as e:
+            logger.warning(f"Disk cache disabled, cannot use {directory}: {e}")
+            self.enabled = False
+
+    def _scan_size(self) -> int:
+        """Total size of cached files, deleting temp files left by interrupted writes"""
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(".tmp"):
+                    # No writer is active yet, so any temp file is stale
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                total += entry.stat().st_size
+        return total
+
+    def _path(self, key: bytes) -> Path:
+        return self.directory / key.hex()
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        """Read a cached value, or None if missing"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return data
+
+    def set(self, key: bytes, value: bytes) -> None:
+        """Store a value with an atomic write, pruning old entries if over size"""
+        if not self.enabled or len(value) > self.max_size:
+            return
+        path = self._path(key)
+        temp_file = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            temp_file.write_bytes(value)
+            temp_file.replace(path)
+        except OSError as e:
+            logger.warning(f"Failed to write disk cache entry: {e}")
+            temp_file.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._size += len(value)
+            if self._size > self.max_size:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Delete least recently used files until under the size target"""
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".tmp"):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Removed or unreadable mid-scan
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"Failed to prune disk cache: {e}")
+            return
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = self.max_size * self.PRUNE_RATIO
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+        self._size = total
@@ -1,9 +1,13 @@
 """Voice definitions and utilities for Gemini TTS"""
 
+import os
 from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class VoiceInfo:
     """Information about a voice"""
 
@@ -13,7 +17,7 @@ class VoiceInfo:
 
 
 # All 30 available Gemini TTS voices
-VOICES: dict[str, VoiceInfo] = {
+_VOICES: dict[str, VoiceInfo] = {
     "Kore": VoiceInfo("Kore", "Firm and authoritative", "professional"),
     "Puck": VoiceInfo("Puck", "Upbeat and cheerful", "energetic"),
     "Charon": VoiceInfo("Charon", "Informative and clear", "narrator"),
@@ -46,8 +50,11 @@ VOICES: dict[str, VoiceInfo] = {
     "Sadaltager": VoiceInfo("Sadaltager", "Gentle and kind", "kind"),
 }
 
+# Read-only view: the voice table is static
+VOICES = MappingProxyType(_VOICES)
+
 # Featured voices for the selection menu (most distinct/popular)
-FEATURED_VOICES = [
+FEATURED_VOICES = (
     "Kore",
     "Puck",
     "Charon",
@@ -56,19 +63,22 @@ FEATURED_VOICES = [
     "Enceladus",
     "Sulafat",
     "Orus",
-]
+)
+
+
+# Precomputed lookups (the voice table is static)
+_VOICE_NAMES = frozenset(VOICES)
+_VOICE_DESCRIPTIONS = {name: info.description for name, info in VOICES.items()}
 
 
 def get_voice_description(voice_name: str) -> str:
     """Get description for a voice"""
-    if voice_name in VOICES:
-        return VOICES[voice_name].description
-    return "Unknown voice"
+    return _VOICE_DESCRIPTIONS.get(voice_name, "Unknown voice")
 
 
 def is_valid_voice(voice_name: str) -> bool:
     """Check if a voice name is valid"""
-    return voice_name in VOICES
+    return voice_name in _VOICE_NAMES
 
 
 def get_all_voice_names() -> list[str]:
@@ -76,31 +86,37 @@ def get_all_voice_names() -> list[str]:
     return list(VOICES.keys())
 
 
+# Voice per character trait for exact trait matches (reversed so the first
+# voice listed wins when several share a trait)
+_BY_CHARACTER = {info.character: name for name, info in reversed(VOICES.items())}
+
+# Keyword fallbacks for free-form traits, checked in order
+_TRAIT_MAPPINGS = {
+    "male": ["Orus", "Iapetus", "Fenrir", "Charon"],
+    "female": ["Leda", "Despina", "Zephyr", "Aoede"],
+    "old": ["Schedar", "Rasalgethi", "Orus"],
+    "young": ["Leda", "Puck", "Zephyr"],
+    "serious": ["Kore", "Charon", "Achernar"],
+    "funny": ["Puck", "Fenrir", "Gacrux"],
+    "angry": ["Iapetus", "Fenrir", "Alnilam"],
+    "sad": ["Enceladus", "Laomedeia", "Umbriel"],
+    "happy": ["Puck", "Zephyr", "Gacrux"],
+    "calm": ["Autonoe", "Laomedeia", "Sulafat"],
+    "excited": ["Fenrir", "Puck", "Erinome"],
+}
+
+
 def get_voice_for_character(character_trait: str) -> str:
     """Suggest a voice based on character trait"""
     trait_lower = character_trait.lower()
 
     # Direct match
-    for name, info in VOICES.items():
-        if info.character == trait_lower:
-            return name
+    name = _BY_CHARACTER.get(trait_lower)
+    if name is not None:
+        return name
 
     # Keyword matching
-    trait_mappings = {
-        "male": ["Orus", "Iapetus", "Fenrir", "Charon"],
-        "female": ["Leda", "Despina", "Zephyr", "Aoede"],
-        "old": ["Schedar", "Rasalgethi", "Orus"],
-        "young": ["Leda", "Puck", "Zephyr"],
-        "serious": ["Kore", "Charon", "Achernar"],
-        "funny": ["Puck", "Fenrir", "Gacrux"],
-        "angry": ["Iapetus", "Fenrir", "Alnilam"],
-        "sad": ["Enceladus", "Laomedeia", "Umbriel"],
-        "happy": ["Puck", "Zephyr", "Gacrux"],
-        "calm": ["Autonoe", "Laomedeia", "Sulafat"],
-        "excited": ["Fenrir", "Puck", "Erinome"],
-    }
-
-    for keyword, voices in trait_mappings.items():
+    for keyword, voices in _TRAIT_MAPPINGS.items():
         if keyword in trait_lower:
             return voices[0]
 
@@ -111,10 +127,6 @@ def get_voice_for_character(character_trait: str) -> str:
 # Sample text for voice preview
 PREVIEW_TEXT = "Hello! Nice to meet you. 你好！很高兴认识你。"
 
-# Samples directory path
-import os
-from pathlib import Path
-
 
 def _get_samples_dir() -> Path:
     """Get samples directory from env or use default relative to project root"""
@@ -128,11 +140,15 @@ def _get_samples_dir() -> Path:
 SAMPLES_DIR = _get_samples_dir()
 
 
+# Sample file path per voice, built once
+_SAMPLE_PATHS = {name: SAMPLES_DIR / f"{name}.mp3" for name in VOICES}
+
+
+# Samples are generated offline, so the existence check is cached
+@lru_cache(maxsize=64)
 def get_sample_path(voice_name: str) -> Path | None:
     """Get path to pre-generated sample file for a voice"""
-    if not is_valid_voice(voice_name):
-        return None
-    sample_file = SAMPLES_DIR / f"{voice_name}.mp3"
-    if sample_file.exists():
+    sample_file = _SAMPLE_PATHS.get(voice_name)
+    if sample_file is not None and sample_file.is_file():
         return sample_file
     return None